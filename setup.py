@@ -28,6 +28,8 @@ REQUIRED = [
 # What packages are optional?
 EXTRAS = {
     # 'fancy feature': ['django'],
+    'images': ['Pillow'],
+    'minify': ['rcssmin', 'rjsmin'],
 }
 
 # The rest you shouldn't have to touch too much :)
@@ -0,0 +1,259 @@
+import hashlib
+import logging
+import posixpath
+import re
+from pathlib import Path
+from theme_installer.locks import atomic_write
+from theme_installer.utils import rgx_attr, rgx_link, rgx_script, static_url_to_path, pool_map
+
+logger = logging.getLogger('')
+
+rgx_css_url = re.compile(r'url\(\s*(["\']?)(?!data:|[a-z]+:|/|#)([^"\')]+)\1\s*\)', re.I)
+rgx_css_import = re.compile(r'@import\b', re.I)
+rgx_css_charset = re.compile(r'^\ufeff?\s*@charset\s+[^;]*;', re.I)
+rgx_use_strict = re.compile(r'^\ufeff?\s*(?:(?://[^\n]*\n|/\*.*?\*/)\s*)*([\'"])use strict\1', re.S)
+
+
+def minify_file(path:str) -> tuple:
+    """
+    Minify the css or js file at `path` in place.
+
+    Return a tuple (path, size before, size after)
+    """
+    p = Path(path)
+    before = p.stat().st_size
+    try:
+        src_code = p.read_text(encoding='utf-8')
+        if p.suffix == '.css':
+            from rcssmin import cssmin
+            mod_code = cssmin(src_code)
+        else:
+            from rjsmin import jsmin
+            mod_code = jsmin(src_code)
+        if len(mod_code.encode('utf-8')) < before:
+            p.write_text(mod_code, encoding='utf-8')
+    except (UnicodeDecodeError, ValueError) as e:
+        logger.warning("Unable to minify {}: {}".format(p, e))
+
+    return path, before, p.stat().st_size
+
+
+def build_bundle(dest:str, kind:str, files:list) -> str:
+    """
+    Concatenate `files`, a list of (path, url) couples, in the bundle `dest`.
+    The relative urls of css files are rewritten to stay valid from the bundle.
+    """
+    parts = []
+    for path, url in files:
+        src_code = Path(path).read_text(encoding='utf-8')
+        # @charset is only valid at the very start of the bundle
+        if kind == 'css' and parts:
+            src_code = rgx_css_charset.sub('', src_code, count=1)
+        if kind == 'css':
+            base_url = posixpath.dirname(url)
+            src_code = rgx_css_url.sub(
+                lambda m: 'url("{}")'.format(
+                    posixpath.normpath(posixpath.join(base_url, m.group(2)))),
+                src_code)
+        parts.append(src_code)
+
+    sep = '\n' if kind == 'css' else ';\n'
+    Path(dest).write_text(sep.join(parts), encoding='utf-8')
+    return dest
+
+
+class AssetMinifier:
+    """
+    Minify the css and js files copied in a static dir using a pool of processes
+
+    :param Path dest_dir: The static dir of the theme
+    :param int workers: The number of processes, default to the cpu count, 0 to
+        work in this process
+    """
+
+    def __init__(self, dest_dir:Path, workers=None):
+        self.dest_dir = Path(dest_dir)
+        self.workers = workers
+
+    def find_assets(self):
+        for p in self.dest_dir.rglob('*'):
+            if p.is_file() and p.suffix in ('.css', '.js')\
+               and not p.name.endswith(('.min.css', '.min.js')):
+                yield str(p)
+
+    def proceed(self) -> dict:
+        """
+        Minify all the assets.
+
+        Return a dict with the number of files minified and the number of
+        bytes saved.
+        """
+        try:
+            import rcssmin, rjsmin
+        except ImportError:
+            logger.warning("rcssmin and rjsmin are not installed, css and js "
+                           "files are not minified")
+            return {'minified': 0, 'saved': 0}
+
+        todo = list(self.find_assets())
+        saved = 0
+        for path, before, after in pool_map(minify_file, todo,
+                                            workers=self.workers, chunksize=16):
+            saved += before - after
+
+        return {'minified': len(todo), 'saved': saved}
+
+
+class AssetBundler:
+    """
+    Concatenate the runs of css and js tags shared by many pages in bundles and
+    rewrite the tags of those pages.
+
+    :param Path templates_dir: The templates dir of the django project
+    :param list html_paths: The installed html files relative to templates_dir
+    :param Path static_dir: The static dir of the django project
+    :param str static_url: The url prefix of the static dir, like `/static/`
+    :param str name: The name of the theme, bundles go in static_dir/name/bundles
+    :param int min_pages: The minimum number of pages sharing a run of tags to
+        build a bundle
+    :param int workers: The number of processes, default to the cpu count, 0 to
+        work in this process
+    """
+
+    def __init__(self, templates_dir:Path, html_paths:list, static_dir:Path,
+                 static_url:str, name:str, min_pages=2, workers=None):
+        self.templates_dir = Path(templates_dir)
+        self.html_paths = list(dict.fromkeys(html_paths))
+        self.static_dir = Path(static_dir)
+        self.static_url = static_url
+        self.name = name
+        self.min_pages = min_pages
+        self.workers = workers
+        self.cmp_rgx_tag = re.compile(r'{}|{}\s*</script>'.format(rgx_link, rgx_script),
+                                      re.I | re.S)
+        self.files_cache = {}
+
+    def url_to_path(self, url:str):
+        return static_url_to_path(url, self.static_url, self.static_dir)
+
+    def parse_tag(self, match):
+        """
+        Return a (kind, url) couple if the tag can be bundled, None otherwise
+        """
+        attrs_str = match.group(1) if match.group(1) is not None else match.group(2)
+        attrs = {k.lower(): v for k, _, v in rgx_attr.findall(attrs_str)}
+        # bare attributes like async make the tag not bundleable, except defer
+        bare = rgx_attr.sub('', attrs_str).replace('/', ' ').lower().split()
+        if match.group(1) is not None:
+            if attrs.get('rel', '').lower() != 'stylesheet'\
+               or set(attrs) - {'rel', 'href', 'type'} or bare:
+                return None
+            kind, url = 'css', attrs.get('href', '')
+        else:
+            if attrs.get('type', 'text/javascript').lower() != 'text/javascript'\
+               or set(attrs) - {'src', 'type'} or set(bare) - {'defer'}:
+                return None
+            # deferred scripts are only bundled with deferred scripts
+            kind, url = 'js-defer' if bare else 'js', attrs.get('src', '')
+
+        if (kind, url) not in self.files_cache:
+            self.files_cache[kind, url] = self.can_bundle(kind, url)
+        return (kind, url) if self.files_cache[kind, url] else None
+
+    def can_bundle(self, kind:str, url:str) -> bool:
+        """
+        Return whether or not the file at `url` can be concatenated with others
+        """
+        path = self.url_to_path(url)
+        if not path:
+            return False
+        try:
+            src_code = path.read_text(encoding='utf-8')
+        except UnicodeDecodeError:
+            # build_bundle couldn't decode it either
+            return False
+        # an @import is only valid at the top of a stylesheet
+        if kind == 'css' and rgx_css_import.search(src_code):
+            return False
+        # a "use strict" directive would apply to the whole bundle
+        if kind != 'css' and rgx_use_strict.search(src_code):
+            return False
+        return True
+
+    def find_runs(self, src_code:str) -> list:
+        """
+        Return the runs of consecutive bundleable tags of the same kind as a
+        list of (start, end, ((kind, url), ...))
+        """
+        runs = []
+        cur = []
+        last_end = None
+        for m in self.cmp_rgx_tag.finditer(src_code):
+            tag = self.parse_tag(m)
+            contiguous = last_end is not None and not src_code[last_end:m.start()].strip()
+            if tag and cur and contiguous and cur[-1][2][0] == tag[0]:
+                cur.append((m.start(), m.end(), tag))
+            else:
+                if len(cur) > 1:
+                    runs.append(cur)
+                cur = [(m.start(), m.end(), tag)] if tag else []
+            last_end = m.end()
+        if len(cur) > 1:
+            runs.append(cur)
+
+        return [(run[0][0], run[-1][1], tuple(t[2] for t in run)) for run in runs]
+
+    def proceed(self) -> dict:
+        """
+        Build the bundles and rewrite the pages.
+
+        Return a dict with the number of bundles built and tags removed.
+        """
+        pages = {}
+        counts = {}
+        for hp in self.html_paths:
+            p = self.templates_dir.joinpath(hp)
+            if not p.is_file():
+                continue
+            src_code = p.read_text(encoding='utf-8')
+            runs = self.find_runs(src_code)
+            pages[p] = (src_code, runs)
+            for _, _, key in set(runs):
+                counts[key] = counts.get(key, 0) + 1
+
+        bundles = {}
+        bundle_dir = self.static_dir.joinpath(self.name, 'bundles')
+        for key, count in counts.items():
+            if count < self.min_pages:
+                continue
+            kind = key[0][0]
+            digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:12]
+            dest = bundle_dir.joinpath('{}.{}'.format(digest, 'css' if kind == 'css' else 'js'))
+            files = [(str(self.url_to_path(url)), url) for _, url in key]
+            bundles[key] = (str(dest), kind, files)
+
+        if not bundles:
+            return {'bundles': 0, 'removed': 0}
+
+        bundle_dir.mkdir(exist_ok=True)
+        todo = list(bundles.values())
+        pool_map(build_bundle, *zip(*todo), workers=self.workers)
+
+        removed = 0
+        for p, (src_code, runs) in pages.items():
+            for start, end, key in reversed(runs):
+                if key not in bundles:
+                    continue
+                dest, kind, _ = bundles[key]
+                url = self.static_url + Path(dest).relative_to(self.static_dir).as_posix()
+                if kind == 'css':
+                    tag = '<link rel="stylesheet" href="{}">'.format(url)
+                elif kind == 'js-defer':
+                    tag = '<script src="{}" defer></script>'.format(url)
+                else:
+                    tag = '<script src="{}"></script>'.format(url)
+                src_code = src_code[:start] + tag + src_code[end:]
+                removed += len(key) - 1
+            atomic_write(p, src_code, encoding='utf-8')
+
+        return {'bundles': len(bundles), 'removed': removed}
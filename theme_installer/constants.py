@@ -5,3 +5,7 @@ ASSETS_NAMES = ['js', 'javascript', 'img', 'image', 'images', 'css',
 TEMPLATES_DIR_NAMES = ['templates', 'themes']
 
 STATIC_DIR_NAMES = ['dev_static', 'static']
+
+IMAGES_EXTENSIONS = ['.png', '.jpg', '.jpeg']
+
+MANIFEST_NAME = '.theme_installer.json'
@@ -0,0 +1,120 @@
+import errno
+import os
+import shutil
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError: # windows
+    fcntl = None
+
+# ioctl request to share the extents of a file (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+# errors meaning a method is not supported here, the next method is tried
+UNSUPPORTED_ERRNOS = {errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.ENOTTY,
+                      errno.EOPNOTSUPP, errno.EPERM, errno.EBADF}
+
+
+class FileCopier:
+    """
+    Copy files choosing the method by their size. On Linux the large files are
+    cloned (reflink) or copied in the kernel with copy_file_range or sendfile,
+    without going through user space buffers. Small files and other systems use
+    a buffered copy.
+
+    :param int threshold: The size in bytes from which a file is large
+    """
+
+    def __init__(self, threshold=8 * 1024 * 1024):
+        self.threshold = threshold
+        self.linux = sys.platform.startswith('linux')
+        self.disabled = set()
+        self.stats = {}
+        self.seconds = 0.0
+
+    def copy(self, src, dst):
+        """
+        Copy the file `src` to `dst` with its metadata, like shutil.copy2
+        """
+        start = time.perf_counter()
+        size = os.stat(src).st_size
+        method = None
+        if self.linux and size >= self.threshold:
+            method = self.fast_copy(src, dst, size)
+        if not method:
+            self.buffered(src, dst)
+            method = 'buffered'
+        shutil.copystat(src, dst)
+
+        self.seconds += time.perf_counter() - start
+        count, total = self.stats.get(method, (0, 0))
+        self.stats[method] = (count + 1, total + size)
+        return dst
+
+    def fast_copy(self, src, dst, size:int):
+        """
+        Try the kernel copy methods in order, return the name of the one which
+        worked or None
+        """
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            for method in ('reflink', 'copy_file_range', 'sendfile'):
+                if method in self.disabled:
+                    continue
+                try:
+                    if getattr(self, method)(fsrc.fileno(), fdst.fileno(), size):
+                        return method
+                except OSError as e:
+                    if e.errno not in UNSUPPORTED_ERRNOS:
+                        raise
+                    self.disabled.add(method)
+                # start again from a clean destination
+                fdst.truncate(0)
+                os.lseek(fsrc.fileno(), 0, os.SEEK_SET)
+                os.lseek(fdst.fileno(), 0, os.SEEK_SET)
+        return None
+
+    def buffered(self, src, dst):
+        # not shutil.copyfile, it already uses sendfile on linux
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+
+    def reflink(self, src_fd:int, dst_fd:int, size:int) -> bool:
+        if not fcntl:
+            raise OSError(errno.ENOSYS, "reflink not available")
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+
+    def copy_file_range(self, src_fd:int, dst_fd:int, size:int) -> bool:
+        if not hasattr(os, 'copy_file_range'):
+            raise OSError(errno.ENOSYS, "copy_file_range not available")
+        copied = 0
+        while copied < size:
+            sent = os.copy_file_range(src_fd, dst_fd, size - copied)
+            if sent == 0:
+                return False
+            copied += sent
+        return True
+
+    def sendfile(self, src_fd:int, dst_fd:int, size:int) -> bool:
+        copied = 0
+        while copied < size:
+            sent = os.sendfile(dst_fd, src_fd, copied, size - copied)
+            if sent == 0:
+                return False
+            copied += sent
+        return True
+
+    def report(self) -> str:
+        """
+        Return a summary of the files copied per method and the throughput
+        """
+        total = sum(size for _, size in self.stats.values())
+        count = sum(c for c, _ in self.stats.values())
+        mib = total / (1024 * 1024)
+        rate = mib / self.seconds if self.seconds else 0
+        methods = ', '.join('{} {} ({:.1f} MiB)'.format(method, c, size / (1024 * 1024))
+                            for method, (c, size) in sorted(self.stats.items()))
+        return "{} files, {:.1f} MiB in {:.2f}s ({:.1f} MiB/s): {}".format(
+            count, mib, self.seconds, rate, methods)
@@ -1,9 +1,17 @@
 from pathlib import Path
 from theme_installer.constants import *
+import os
 import re
 import shutil
 import logging
 from theme_installer.loaders import BaseLoader
+from theme_installer.images import ImageOptimizer
+from theme_installer.assets import AssetMinifier, AssetBundler
+from theme_installer.profiling import NoProfiler
+from theme_installer.locks import FileLock, atomic_write
+from theme_installer.journal import Journal, source_fingerprint
+from theme_installer.preloads import PreloadCollector
+from theme_installer.copying import FileCopier
 from theme_installer.utils import *
 
 #logger = logging.getLogger('ThemeInstaller')
@@ -21,6 +29,28 @@ class ThemeInstaller:
     :param str templates_dir: The path to the templates dir of the django project.
     :param bool sub_theme: Whether or not this theme is a sub theme
     :param str parent: if this theme is a sub-theme his parent should be specified
+    :param bool optimize_images: Whether or not the images should be recompressed
+    :param bool webp: Whether or not WebP variants of the images should be created
+    :param bool minify: Whether or not the css and js files should be minified
+    :param bool bundle: Whether or not the css and js tags shared by many pages
+        should be concatenated in bundles
+    :param int bundle_min_pages: The minimum number of pages sharing the tags
+        to build a bundle
+    :param bool preload: Whether or not the critical css, js and fonts of each
+        page should be collected in `preloads`
+    :param HtmlTransformer transformer: If given the pages are transformed to
+        load faster while their asset links are rewritten
+    :param FileCopier copier: The copier of the static files, large files are
+        copied without user space buffers
+    :param int workers: The number of processes used for the heavy stages
+    :param Profiler profiler: If given each phase of the installation is profiled,
+        the heavy stages then run in this process so that they are profiled too
+    :param bool resume: Whether or not an interrupted install should be resumed
+        from its journal instead of restarted
+    :param Journal journal: The journal of the parent theme, sub-themes share it
+    :param str static_root: The static dir of the top theme, sub-themes get it
+    :param str previous_dir: The static dir of the previous install of this
+        theme, sub-themes get the matching subtree of their parent's one
     """
     
     rgx_html = re.compile(r"\.html?$")
@@ -32,7 +62,11 @@ class ThemeInstaller:
     
     def __init__(self, name:str, from_dir:str, loader:BaseLoader, 
                  sub_theme=False, parent=None, prefix=None,
-                 parent_assets_dir:list=None, root_name=None):
+                 parent_assets_dir:list=None, root_name=None,
+                 optimize_images=False, webp=False, minify=False, bundle=False,
+                 bundle_min_pages=2, preload=False, transformer=None,
+                 copier=None, workers=None, profiler=None, resume=False, journal=None,
+                 static_root=None, previous_dir=None):
         loader_dirs = loader.to_dict()
         self.static_dir = Path(loader_dirs['static_dir'])
         self.from_dir = Path(from_dir)
@@ -43,8 +77,11 @@ class ThemeInstaller:
         self.name = name
         self.sub_theme = sub_theme
         self.parent_name = parent if parent else ''
+        self.prefix = prefix
+        self.static_url = '/static/'
         if prefix:
             self.rgx_repl_format = r'\1="/%s/{}/\2' % prefix
+            self.static_url = '/%s/' % prefix
         
         if not self.static_dir.exists():
             if self.sub_theme:
@@ -72,6 +109,29 @@ class ThemeInstaller:
         self.html_installed = []
         self.is_parent_asset_dir = False
         self.root_name = root_name
+        self.optimize_images = optimize_images
+        self.webp = webp
+        self.minify = minify
+        self.bundle = bundle
+        self.bundle_min_pages = bundle_min_pages
+        self.preload = preload
+        self.preloads = {}
+        self.transformer = transformer
+        self.copier = copier if copier else FileCopier()
+        # the static dir of the top theme, static urls are relative to it
+        self.static_root = Path(static_root) if static_root else self.static_dir
+        # the top theme moves its previous install aside and removes it once
+        # the sub-themes are installed too
+        self.own_previous_dir = previous_dir is None
+        self.previous_dir = Path(previous_dir) if previous_dir else \
+            self.static_dir.joinpath('.{}.previous'.format(self.name))
+        self.workers = workers
+        self.profiler = profiler if profiler else NoProfiler()
+        if profiler:
+            # cProfile and tracemalloc only see this process
+            self.workers = 0
+        self.resume = resume
+        self.journal = journal
                 
     def load_from_dir(self):
         """
@@ -103,19 +163,22 @@ class ThemeInstaller:
         try:
             dest_dir.mkdir()
         except FileExistsError:
-            shutil.rmtree(dest_dir)
-            dest_dir.mkdir()
+            # when resuming we keep what was already copied
+            if not self.journal.resumed:
+                shutil.rmtree(dest_dir)
+                dest_dir.mkdir()
             
         index_present = False
         for html in self.html_files:
-            shutil.copyfile(html, dest_dir.joinpath(html.name))
+            self.copy_file(html, dest_dir.joinpath(html.name), shutil.copyfile)
             if html.name.startswith('index.htm'):
                 index_present = True
                 
         if not index_present:
             for html in self.html_files:
                 if html.name.startswith('layout'):
-                    shutil.copyfile(html, dest_dir.joinpath('index.html'))
+                    self.copy_file(html, dest_dir.joinpath('index.html'),
+                                   shutil.copyfile)
                     break
                 
     def copy_static(self):
@@ -123,43 +186,111 @@ class ThemeInstaller:
         Copy the assets to the static dir
         """
         dest_dir = self.static_dir.joinpath(self.name)
-        if dest_dir.exists():
-            shutil.rmtree(dest_dir)
-        dest_dir.mkdir()
+        # keep the previous install aside to reuse the images already optimized
+        previous_dir = self.previous_dir
+        # when resuming we keep what was already copied
+        if not self.journal.resumed:
+            if self.own_previous_dir and previous_dir.exists():
+                shutil.rmtree(previous_dir)
+            if dest_dir.exists():
+                if self.optimize_images and self.own_previous_dir:
+                    dest_dir.rename(previous_dir)
+                else:
+                    shutil.rmtree(dest_dir)
+        dest_dir.mkdir(exist_ok=True)
         
         for f in self.asset_dirs:
             sta_dir = dest_dir.joinpath(f.name)
                 
-            shutil.copytree(f, sta_dir)
+            self.copy_tree(f, sta_dir)
+            
+        if self.optimize_images and not self.journal.done('optimize:' + str(dest_dir)):
+            logger.info("Optimizing images...")
+            optimizer = ImageOptimizer(dest_dir, previous_dir, webp=self.webp,
+                                       workers=self.workers)
+            res = optimizer.proceed()
+            logger.info("Optimizing images done: {optimized} optimized, {skipped} "
+                        "already optimized, {saved} bytes saved.".format(**res))
+            self.journal.mark('optimize:' + str(dest_dir))
+                
+        if self.minify and not self.journal.done('minify:' + str(dest_dir)):
+            logger.info("Minifying css and js files...")
+            res = AssetMinifier(dest_dir, workers=self.workers).proceed()
+            logger.info("Minifying css and js files done: {minified} files, "
+                        "{saved} bytes saved.".format(**res))
+            self.journal.mark('minify:' + str(dest_dir))
+            
+    def copy_tree(self, src, dst):
+        """
+        Copy a dir like shutil.copytree, but the dirs may already exist when
+        resuming and each file goes through copy_file
+        """
+        for root, dirs, files in os.walk(str(src), followlinks=True):
+            dest_root = Path(dst).joinpath(os.path.relpath(root, str(src)))
+            dest_root.mkdir(parents=True, exist_ok=True)
+            for name in files:
+                self.copy_file(os.path.join(root, name), dest_root.joinpath(name))
+            
+    def copy_file(self, src, dst, copy_function=None):
+        """
+        Copy a file unless the journal says it was already copied
+        """
+        key = 'copy:' + str(dst)
+        if not (self.journal.done(key) and Path(dst).exists()):
+            (copy_function or self.copier.copy)(src, dst)
+            self.journal.mark(key)
+        return dst
             
     def replace_static_html(self):
         """
         Fix asset paths to the static dir
         """
-        for f in self.asset_dirs:
-            for p in self.templates_dir.joinpath(self.name).iterdir():
-                if p.is_dir():
-                    continue
+        # check if we are a sub theme and we are used parent asset dirs
+        if self.sub_theme and self.is_parent_asset_dir:
+            new = self.rgx_repl_format.format(self.root_name)
+        elif self.parent_name: # we are sub dir but we don't use parent asset dirs
+            new = self.rgx_repl_format\
+                .format("{}/{}".format(self.parent_name, self.name))
+        else:
+            new = self.rgx_repl_format.format(self.name)
             
-                old = self.rgx_find_format.format(f.name)
-                
-                # check if we are a sub theme and we are used parent asset dirs
-                if self.sub_theme and self.is_parent_asset_dir:
-                    new = self.rgx_repl_format.format(self.root_name)
-                elif self.parent_name: # we are sub dir but we don't use parent asset dirs
-                    new = self.rgx_repl_format\
-                        .format("{}/{}".format(self.parent_name, self.name))
-                else:
-                    new = self.rgx_repl_format.format(self.name)
-                
-                self.replacer(p, old, new)
+        # each file is read and written once, all the rewrites and the
+        # transforms are done in the same pass
+        for p in self.templates_dir.joinpath(self.name).iterdir():
+            # only pages, not the hidden temporary files of atomic_write
+            if p.is_dir() or p.name.startswith('.') or not self.rgx_html.search(p.name):
+                continue
+            
+            key = 'rewrite:{}'.format(p)
+            if not self.journal.done(key):
+                sr_code = open(p).read()
+                for f in self.asset_dirs:
+                    old = self.rgx_find_format.format(f.name)
+                    sr_code = re.sub(old, new, sr_code, flags=re.MULTILINE)
+                if self.transformer:
+                    sr_code = self.transformer.transform(sr_code, self.url_to_path)
+                atomic_write(p, sr_code)
+                self.journal.mark(key)
                 
+            if self.asset_dirs:
                 self.html_installed.append("{}/{}".format(self.name, p.name))
                 
+    def url_to_path(self, url:str):
+        """
+        Return the file copied in the static dir for a static url, None if
+        there isn't
+        """
+        return static_url_to_path(url, self.static_url, self.static_root)
+                
     def replace_hrefs_html(self, html_paths, urls:dict):
         """
         Replace html href with url tag
         """
+        with FileLock(self.templates_dir.joinpath(self.name)), \
+             self.profiler.phase(self.name + '.replace_hrefs_html'):
+            self._replace_hrefs_html(html_paths, urls)
+            
+    def _replace_hrefs_html(self, html_paths, urls:dict):
         print('Fixing href links in html files...')
         # compile the regex to find href
         cmp_rgx_find = re.compile(self.rgx_href_find_format)
@@ -210,20 +341,46 @@ class ThemeInstaller:
                 new_url = "{% url '"+url_arg+"' %}"
                 sr_code = sr_code.replace(couple[0]+couple[1], couple[0]+new_url)
                 
-            open(p, "w").write(sr_code)
+            atomic_write(p, sr_code)
             
         print('Fixing href links in html files done.')
             
     def replacer(self, source, old, new):
             sr_code = open(source).read()
             mod_code = re.sub(old, new, sr_code, flags=re.MULTILINE)
-            open(source, "w").write(mod_code)
+            atomic_write(source, mod_code)
+            
+    def bundle_static_html(self):
+        """
+        Concatenate the css and js files shared by many pages in bundles
+        """
+        bundler = AssetBundler(self.templates_dir, self.html_installed,
+                               self.static_dir, self.static_url, self.name,
+                               min_pages=self.bundle_min_pages,
+                               workers=self.workers)
+        res = bundler.proceed()
+        logger.info("{bundles} bundles built, {removed} tags removed.".format(**res))
+            
+    def collect_preloads(self):
+        """
+        Collect the critical css, js and fonts of each installed page
+        """
+        collector = PreloadCollector(self.templates_dir, self.html_installed,
+                                     self.static_dir, self.static_url)
+        self.preloads = collector.proceed()
+        logger.info("{} pages with preloads.".format(len(self.preloads)))
             
     def install_sub_themes(self):
         """
         Install all sub-themes.
         """
         for sub in self.sub_dirs:
+            key = 'sub_theme:' + str(self.templates_dir.joinpath(self.name, sub.name))
+            if self.journal.done(key):
+                for sub_html in self.journal.get(key):
+                    self.html_installed.append(self.name+'/'+sub_html)
+                continue
+            
             name = sub.name
             base = str(sub)
             static = str(self.static_dir.joinpath(self.name))
@@ -231,8 +388,16 @@ class ThemeInstaller:
             loader = BaseLoader(templates_dir=template, static_dir=static)
             sub_th = ThemeInstaller(name, base, loader, sub_theme=True,
                                     parent=self.name, root_name=self.root_name,
-                                    parent_assets_dir=self.asset_dirs)
+                                    parent_assets_dir=self.asset_dirs,
+                                    optimize_images=self.optimize_images,
+                                    webp=self.webp, minify=self.minify,
+                                    transformer=self.transformer,
+                                    copier=self.copier, workers=self.workers, profiler=self.profiler,
+                                    journal=self.journal,
+                                    static_root=self.static_root,
+                                    previous_dir=self.previous_dir.joinpath(name))
             sub_html_installed = sub_th.proceed()
+            self.journal.mark(key, sub_html_installed)
             for sub_html in sub_html_installed:
                 self.html_installed.append(self.name+'/'+sub_html)
             
@@ -240,25 +405,74 @@ class ThemeInstaller:
         """
         Method to do all the stuffs at once.
         """
-        logger.info("Loading required files from directory...")
-        self.load_from_dir()
-        logger.info("Loading done.")
+        # lock the destination dirs so that another install of the same theme
+        # can't run at the same time, other themes are not blocked
+        with FileLock(self.templates_dir.joinpath(self.name)), \
+             FileLock(self.static_dir.joinpath(self.name)):
+            # the top theme owns the journal, sub-themes write in it
+            own_journal = self.journal is None
+            if own_journal:
+                # assets given with --assets-dir live out of from_dir
+                source_dirs = [self.from_dir] + list(self.parent_assets_dir or [])
+                fingerprint = source_fingerprint(source_dirs, {
+                    'static_dir': self.static_dir, 'templates_dir': self.templates_dir,
+                    'prefix': self.prefix, 'root_name': self.root_name,
+                    'optimize_images': self.optimize_images, 'webp': self.webp,
+                    'minify': self.minify, 'bundle': self.bundle,
+                    'bundle_min_pages': self.bundle_min_pages,
+                    'transformer': self.transformer.to_dict() if self.transformer else None})
+                self.journal = Journal(self.templates_dir.joinpath(self.name),
+                                       fingerprint, resume=self.resume)
+                
+            logger.info("Loading required files from directory...")
+            with self.profiler.phase(self.name + '.load_from_dir'):
+                self.load_from_dir()
+            logger.info("Loading done.")
         
-        logger.info("Copying html files....")
-        self.copy_html()
-        logger.info("Copying html files done.")
+            logger.info("Copying html files....")
+            with self.profiler.phase(self.name + '.copy_html'):
+                self.copy_html()
+            self.journal.flush()
+            logger.info("Copying html files done.")
         
-        logger.info("Copying static files...")
-        self.copy_static()
-        logger.info("Copying static files done.")
+            logger.info("Copying static files...")
+            with self.profiler.phase(self.name + '.copy_static'):
+                self.copy_static()
+            self.journal.flush()
+            logger.info("Copying static files done.")
         
-        logger.info("Fixing static paths in html files...")
-        self.replace_static_html()
-        logger.info("Fixing static paths in html files done.")
+            logger.info("Fixing static paths in html files...")
+            with self.profiler.phase(self.name + '.replace_static_html'):
+                self.replace_static_html()
+            self.journal.flush()
+            logger.info("Fixing static paths in html files done.")
         
-        logger.info("Installing sub themes...")
-        self.install_sub_themes()
-        logger.info("Installing sub themes done.")
+            logger.info("Installing sub themes...")
+            with self.profiler.phase(self.name + '.install_sub_themes'):
+                self.install_sub_themes()
+            self.journal.flush()
+            logger.info("Installing sub themes done.")
+            
+            if self.own_previous_dir and self.previous_dir.exists():
+                shutil.rmtree(self.previous_dir)
+        
+            # bundles are built once all the pages, sub themes included, are installed
+            if self.bundle and not self.parent_name:
+                logger.info("Bundling css and js files...")
+                with self.profiler.phase(self.name + '.bundle_static_html'):
+                    self.bundle_static_html()
+                logger.info("Bundling css and js files done.")
+                
+            # preloads are collected once the asset links are final
+            if self.preload and not self.parent_name:
+                logger.info("Collecting preloads...")
+                with self.profiler.phase(self.name + '.collect_preloads'):
+                    self.collect_preloads()
+                logger.info("Collecting preloads done.")
+                
+            if own_journal:
+                self.journal.finish()
+                logger.info("Static files copied: {}".format(self.copier.report()))
         
         return self.html_installed
     
@@ -266,9 +480,10 @@ class ThemeInstaller:
 view_tpl = """
 from django.shortcuts import render, redirect, reverse
 from django.views.generic import TemplateView
+{% if preloads %}from .preloads import PreloadMixin{% endif %}
 
 {% for html_path, view_name in datas.items %}
-class {{ view_name}}View(TemplateView):
+class {{ view_name}}View({% if preloads %}PreloadMixin, {% endif %}TemplateView):
     template_name = "{{ html_path }}"
     
     def get_context_data(self, **kwargs):
@@ -278,26 +493,55 @@ class {{ view_name}}View(TemplateView):
     
 {% endfor %}
 
-class DefaultHandlerView(TemplateView):
+class DefaultHandlerView({% if preloads %}PreloadMixin, {% endif %}TemplateView):
     
     def get(self, *args, **kwargs):
         page = self.kwargs.get('page')
         self.template_name = "{{ app }}/"+page
         return super().get(*args, **kwargs)
 """
+
+
+preload_tpl = """{% autoescape off %}
+# Generated by theme installer, the Link header of each page is computed at
+# install time so nothing is parsed at request time.
+
+PRELOADS = {
+{% for html_path, link in datas %}    {{ html_path }}: {{ link }},
+{% endfor %}}
+
+
+# Add the preload Link header of the page to the response. Proxies and CDNs
+# supporting 103 Early Hints can forward it before the response.
+class PreloadMixin:
+    
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        link = PRELOADS.get(self.template_name)
+        if link:
+            response['Link'] = link
+        return response
+{% endautoescape %}"""
     
     
 class ViewInstaller:
     
-    def __init__(self, app, html_paths:list, home_dir=None):
+    def __init__(self, app, html_paths:list, home_dir=None, profiler=None,
+                 preloads:dict=None):
         if not html_paths:
             raise ValueError("No valid list of html files")
         
         self.html_paths = html_paths
         self.app = app
         self.home_dir = home_dir
+        self.preloads = preloads
+        self.profiler = profiler if profiler else NoProfiler()
         
     def proceed(self) -> dict:
+        with self.profiler.phase(self.app + '.views'):
+            return self._proceed()
+        
+    def _proceed(self) -> dict:
         print("Installing {}.views ...".format(self.app))
         from django.template import Template, Context
         
@@ -306,15 +550,21 @@ class ViewInstaller:
             res[html_path] = get_view_name_from_html_name(self.app, html_path)
             
         tpl = Template(view_tpl)
-        view_content = tpl.render(Context({'datas':res, 'app':self.app}))
+        view_content = tpl.render(Context({'datas':res, 'app':self.app,
+                                           'preloads':bool(self.preloads)}))
         
         if self.home_dir:
             view_file:Path = Path(self.home_dir).joinpath(self.app).joinpath('views.py')
         else:
             view_file:Path = Path(Path.cwd()).joinpath(self.app).joinpath('views.py')
             
-        with view_file.open('w') as fp:
-            fp.write(view_content)
+        atomic_write(view_file, view_content)
+        
+        if self.preloads:
+            # keys and values are written as python literals
+            datas = [(repr(k), repr(v)) for k, v in sorted(self.preloads.items())]
+            preload_content = Template(preload_tpl).render(Context({'datas':datas}))
+            atomic_write(view_file.with_name('preloads.py'), preload_content)
             
         print("Installing {}.views done.".format(self.app))
         return res
@@ -342,7 +592,8 @@ class UrlInstaller:
     rgx_set_find_format = r'(INSTALLED_APPS[\t ]*=[\t ]*\[)'
     rgx_set_repl_format = r'\1\n    "{app}", # added by theme installer'    
     
-    def __init__(self, app, html_paths:list, views:dict, home_dir=None):
+    def __init__(self, app, html_paths:list, views:dict, home_dir=None,
+                 profiler=None):
         if not html_paths:
             raise ValueError("No valid list of html files")
         
@@ -350,8 +601,13 @@ class UrlInstaller:
         self.app = app
         self.home_dir = home_dir
         self.views = views
+        self.profiler = profiler if profiler else NoProfiler()
         
     def proceed(self):
+        with self.profiler.phase(self.app + '.urls'):
+            return self._proceed()
+        
+    def _proceed(self):
         print("Installing {}.urls...".format(self.app))
         from django.template import Template, Context
         
@@ -371,13 +627,16 @@ class UrlInstaller:
         else:
             url_file:Path = Path(Path.cwd()).joinpath(self.app).joinpath('urls.py')
             
-        with url_file.open('w') as fp:
-            fp.write(url_content)
+        atomic_write(url_file, url_content)
             
         print("Installing {}.urls done.".format(self.app))
         return res
     
     def install_in_root(self, app, settings, home_dir=None):
+        with self.profiler.phase(self.app + '.install_in_root'):
+            self._install_in_root(app, settings, home_dir)
+            
+    def _install_in_root(self, app, settings, home_dir=None):
         if home_dir:
             home_path = Path(home_dir)
         else:
@@ -385,34 +644,38 @@ class UrlInstaller:
             
         root_url_file:Path = home_path.joinpath(settings.ROOT_URLCONF.replace('.', '/')+'.py')
         print("Adding {}.urls in {} ...".format(self.app, root_url_file))
-        src_code = root_url_file.open().read()
-        
-        pattern = r'path\("{app}/", include\(\("{app}.urls", "{app}"\), namespace="{app}"\)\)'.format(app=app)
-        res = re.search(pattern, src_code, flags=re.MULTILINE)
-        if not res:
-            old = self.rgx_find_format
-            new = self.rgx_repl_format.format(app=app)
-            
-            src_code = re.sub(old, new, src_code, flags=re.MULTILINE)
-            if "import {}".format(app, src_code) not in src_code:
-                src_code = "import {} # added by theme installer\nfrom django.urls import include\n\n{}".format(app, src_code)
+        # the root urlconf and the settings are shared by all the installs, the
+        # read-modify-write must be done under lock
+        with FileLock(root_url_file):
+            src_code = root_url_file.open().read()
             
-            root_url_file.open('w').write(src_code)
+            pattern = r'path\("{app}/", include\(\("{app}.urls", "{app}"\), namespace="{app}"\)\)'.format(app=app)
+            res = re.search(pattern, src_code, flags=re.MULTILINE)
+            if not res:
+                old = self.rgx_find_format
+                new = self.rgx_repl_format.format(app=app)
+                
+                src_code = re.sub(old, new, src_code, flags=re.MULTILINE)
+                if "import {}".format(app, src_code) not in src_code:
+                    src_code = "import {} # added by theme installer\nfrom django.urls import include\n\n{}".format(app, src_code)
+                
+                atomic_write(root_url_file, src_code)
         print("Adding {}.urls in {} done.".format(self.app, root_url_file))
             
         # adding in INSTALLED_APPS
         settings_file:Path = home_path.joinpath(settings.SETTINGS_MODULE.replace('.', '/')+'.py')
         print("Adding {} in {} ...".format(self.app, settings_file))
-        src_code = settings_file.open().read()
-        
-        res = re.search(r'[\t ]*["\']{}["\']'.format(app), src_code, flags=re.MULTILINE)
-        if not res:        
-            old = self.rgx_set_find_format
-            new = self.rgx_set_repl_format.format(app=app)
+        with FileLock(settings_file):
+            src_code = settings_file.open().read()
             
-            src_code = re.sub(old, new, src_code, flags=re.MULTILINE)
-            
-            settings_file.open('w').write(src_code)
+            res = re.search(r'[\t ]*["\']{}["\']'.format(app), src_code, flags=re.MULTILINE)
+            if not res:        
+                old = self.rgx_set_find_format
+                new = self.rgx_set_repl_format.format(app=app)
+                
+                src_code = re.sub(old, new, src_code, flags=re.MULTILINE)
+                
+                atomic_write(settings_file, src_code)
         
         print("Adding {} in {} done.".format(self.app, settings_file))
         
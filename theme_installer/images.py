@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import shutil
+import subprocess
+from pathlib import Path
+from theme_installer.constants import IMAGES_EXTENSIONS, MANIFEST_NAME
+from theme_installer.utils import pool_map
+
+logger = logging.getLogger('')
+
+
+def file_digest(path) -> str:
+    """
+    Return the sha1 hex digest of the file at `path`
+    """
+    h = hashlib.sha1()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def png_bit_depth(path) -> int:
+    """
+    Return the bit depth per channel read in the IHDR chunk of a png, 0 if the
+    file is not a png
+    """
+    with open(path, 'rb') as fp:
+        header = fp.read(25)
+    if len(header) < 25 or header[:8] != b'\x89PNG\r\n\x1a\n' or header[12:16] != b'IHDR':
+        return 0
+    return header[24]
+
+
+def optimize_image(path:str, webp=False) -> tuple:
+    """
+    Losslessly recompress the image at `path` in place and optionally write a
+    WebP variant next to it. The file is only replaced if the result is smaller.
+    Animated images and 16 bits pngs are left untouched, re-saving them would
+    drop frames or bits.
+
+    Return a tuple (path, size before, size after, webp size or None)
+    """
+    from PIL import Image
+
+    p = Path(path)
+    before = p.stat().st_size
+    try:
+        with Image.open(p) as img:
+            if getattr(img, 'n_frames', 1) > 1:
+                return path, before, before, None
+    except Exception as e:
+        logger.warning("Unable to open {}: {}".format(p, e))
+        return path, before, before, None
+    
+    tmp = p.with_name(p.name + '.tmp')
+    ext = p.suffix.lower()
+    try:
+        if ext == '.png' and png_bit_depth(p) > 8:
+            # Pillow loads the 16 bits rgb(a) pngs as 8 bits
+            pass
+        elif ext == '.png':
+            with Image.open(p) as img:
+                img.save(tmp, format='PNG', optimize=True)
+        elif ext in ('.jpg', '.jpeg'):
+            # Pillow can't recompress a jpeg without decoding it, jpegtran can
+            jpegtran = shutil.which('jpegtran')
+            if jpegtran:
+                # keep the metadata, the orientation and icc profile matter
+                subprocess.run([jpegtran, '-copy', 'all', '-optimize',
+                                '-progressive', '-outfile', str(tmp), str(p)],
+                               check=True, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+        if tmp.exists() and tmp.stat().st_size < before:
+            tmp.replace(p)
+    except Exception as e:
+        logger.warning("Unable to optimize {}: {}".format(p, e))
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    webp_size = None
+    if webp:
+        webp_path = p.with_suffix(p.suffix + '.webp')
+        try:
+            with Image.open(p) as img:
+                img.save(webp_path, format='WEBP', lossless=(ext == '.png'))
+            webp_size = webp_path.stat().st_size
+        except Exception as e:
+            logger.warning("Unable to create {}: {}".format(webp_path, e))
+
+    return path, before, p.stat().st_size, webp_size
+
+
+class ImageOptimizer:
+    """
+    Optimize the images copied in a static dir using a pool of processes
+
+    :param Path dest_dir: The static dir of the theme
+    :param Path previous_dir: The previous install of the theme static dir, used
+        to reuse images already optimized
+    :param bool webp: Whether or not WebP variants should be generated
+    :param int workers: The number of processes, default to the cpu count, 0 to
+        optimize in this process
+    """
+
+    def __init__(self, dest_dir:Path, previous_dir:Path=None, webp=False,
+                 workers=None):
+        self.dest_dir = Path(dest_dir)
+        self.previous_dir = Path(previous_dir) if previous_dir else None
+        self.webp = webp
+        self.workers = workers
+        self.manifest = {}
+        if self.previous_dir and self.previous_dir.joinpath(MANIFEST_NAME).exists():
+            with self.previous_dir.joinpath(MANIFEST_NAME).open() as fp:
+                self.manifest = json.load(fp).get('images', {})
+
+    def find_images(self):
+        for p in self.dest_dir.rglob('*'):
+            if p.is_file() and p.suffix.lower() in IMAGES_EXTENSIONS:
+                yield p
+
+    def reuse(self, rel:str, digest:str) -> bool:
+        """
+        Copy back the image optimized by a previous install if the source
+        didn't change since.
+        """
+        entry = self.manifest.get(rel)
+        if not entry or entry.get('source') != digest or not self.previous_dir:
+            return False
+
+        old = self.previous_dir.joinpath(rel)
+        if not old.exists() or file_digest(old) != entry.get('optimized'):
+            return False
+        if self.webp and not old.with_suffix(old.suffix + '.webp').exists():
+            return False
+
+        dest = self.dest_dir.joinpath(rel)
+        shutil.copyfile(old, dest)
+        if self.webp:
+            shutil.copyfile(old.with_suffix(old.suffix + '.webp'),
+                            dest.with_suffix(dest.suffix + '.webp'))
+        return True
+
+    def proceed(self) -> dict:
+        """
+        Optimize all the images and write the manifest.
+
+        Return a dict with the number of images made smaller, the number of
+        images reused from the previous install and the number of bytes saved.
+        """
+        try:
+            import PIL
+        except ImportError:
+            logger.warning("Pillow is not installed, images are not optimized")
+            return {'optimized': 0, 'skipped': 0, 'saved': 0}
+
+        sources = {}
+        todo = []
+        skipped = 0
+        for p in self.find_images():
+            rel = p.relative_to(self.dest_dir).as_posix()
+            sources[rel] = file_digest(p)
+            if self.reuse(rel, sources[rel]):
+                skipped += 1
+            else:
+                todo.append(str(p))
+
+        if not shutil.which('jpegtran') and any(
+                Path(p).suffix.lower() in ('.jpg', '.jpeg') for p in todo):
+            logger.warning("jpegtran is not installed, jpeg images are not "
+                           "optimized")
+
+        saved = 0
+        optimized = 0
+        for path, before, after, webp_size in pool_map(
+                optimize_image, todo, [self.webp] * len(todo), workers=self.workers):
+            if after < before:
+                optimized += 1
+                saved += before - after
+
+        manifest = {}
+        for rel, digest in sources.items():
+            manifest[rel] = {'source': digest,
+                             'optimized': file_digest(self.dest_dir.joinpath(rel))}
+        with self.dest_dir.joinpath(MANIFEST_NAME).open('w') as fp:
+            json.dump({'images': manifest}, fp, indent=2)
+
+        return {'optimized': optimized, 'skipped': skipped, 'saved': saved}
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from theme_installer.locks import atomic_write
+
+logger = logging.getLogger('')
+
+
+def source_fingerprint(source_dirs:list, options:dict=None) -> str:
+    """
+    Return a digest of the paths, sizes and modification times of all the
+    files of the `source_dirs` and of the install `options`
+    """
+    h = hashlib.sha1(json.dumps(options or {}, sort_keys=True, default=str)
+                     .encode('utf-8'))
+    for source_dir in source_dirs:
+        source_dir = os.path.abspath(os.fsdecode(source_dir))
+        h.update('{}\n'.format(source_dir).encode('utf-8'))
+        for root, dirs, files in os.walk(source_dir, followlinks=True):
+            dirs.sort()
+            for name in sorted(files):
+                p = os.path.join(root, name)
+                st = os.stat(p)
+                h.update('{}\0{}\0{}\n'.format(os.path.relpath(p, source_dir),
+                                               st.st_size, st.st_mtime_ns)
+                         .encode('utf-8'))
+    return h.hexdigest()
+
+
+class Journal:
+    """
+    An on-disk journal of the operations completed by an install, used to
+    resume an interrupted install where it stopped. The journal is append-only:
+    a header line with the fingerprint, then one json line per operation,
+    appended at each checkpoint.
+
+    :param Path path: The installed templates dir of the theme, the journal is
+        written next to it
+    :param str fingerprint: The fingerprint of the source, see `source_fingerprint`
+    :param bool resume: Whether or not the operations of a previous journal
+        should be reused
+    :param int flush_every: The number of operations between two checkpoints
+    """
+
+    def __init__(self, path, fingerprint:str, resume=False, flush_every=100):
+        path = Path(path)
+        self.path = path.with_name('.{}.journal.jsonl'.format(path.name))
+        self.fingerprint = fingerprint
+        self.flush_every = flush_every
+        self.ops = {}
+        self.pending = []
+        self.resumed = False
+        # whether the file holds the header and all the ops, new ops can then
+        # be appended to it, otherwise it is rewritten at the next checkpoint
+        self.started = False
+
+        if resume and self.path.exists():
+            self.load()
+
+    def load(self):
+        with self.path.open(encoding='utf-8') as fp:
+            lines = fp.readlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+        if header.get('fingerprint') != self.fingerprint:
+            logger.warning("The source changed since the last install, "
+                           "restarting from scratch.")
+            return
+
+        self.started = True
+        for line in lines[1:]:
+            try:
+                key, value = json.loads(line)
+            except ValueError:
+                # the last checkpoint was interrupted, rewrite the journal
+                # without its partial line
+                self.started = False
+                break
+            self.ops[key] = value
+        self.resumed = True
+        logger.info("Resuming the install, {} operations already "
+                    "done.".format(len(self.ops)))
+
+    def done(self, key:str) -> bool:
+        return key in self.ops
+
+    def get(self, key:str, default=None):
+        return self.ops.get(key, default)
+
+    def mark(self, key:str, value=True):
+        self.ops[key] = value
+        self.pending.append(key)
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Append the pending operations to the journal
+        """
+        if not self.started:
+            header = json.dumps({'fingerprint': self.fingerprint, 'time': time.time()})
+            atomic_write(self.path, ''.join(
+                [header + '\n'] + [self.to_line(k) for k in self.ops]))
+            self.started = True
+        elif self.pending:
+            with self.path.open('a', encoding='utf-8') as fp:
+                fp.write(''.join(self.to_line(k) for k in self.pending))
+                fp.flush()
+                os.fsync(fp.fileno())
+        self.pending = []
+
+    def to_line(self, key:str) -> str:
+        return json.dumps([key, self.ops[key]]) + '\n'
+
+    def finish(self):
+        """
+        Remove the journal once the install is complete
+        """
+        if self.path.exists():
+            self.path.unlink()
+        self.ops = {}
+        self.pending = []
+        self.started = False
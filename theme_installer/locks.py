@@ -0,0 +1,90 @@
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError: # windows
+    fcntl = None
+    import msvcrt
+
+# all the lock files live here, out of the dirs of the project
+LOCKS_DIR = os.path.join(tempfile.gettempdir(), 'theme_installer_locks')
+
+
+class FileLock:
+    """
+    An exclusive inter-process lock held on a `.lock` file, used as a context
+    manager. The lock is released when the process dies.
+
+    :param str path: The path of the file or dir to protect
+    :param str lock_dir: The dir of the lock files, they are named after the
+        digest of the real path they protect
+    """
+
+    def __init__(self, path, lock_dir=LOCKS_DIR):
+        real_path = os.path.realpath(str(path))
+        digest = hashlib.sha1(real_path.encode('utf-8')).hexdigest()
+        self.lock_path = Path(lock_dir).joinpath(digest + '.lock')
+        self.fd = None
+
+    def acquire(self):
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        # the lock file is kept, removing it would let another process lock
+        # a new file while this one is still held
+        self.fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        else:
+            # LK_LOCK gives up after 10 seconds, wait as long as flock does
+            while True:
+                try:
+                    msvcrt.locking(self.fd, msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+    def release(self):
+        if self.fd is None:
+            return
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        os.close(self.fd)
+        self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def atomic_write(path, content:str, encoding:str=None):
+    """
+    Write `content` in the file at `path` so that readers see either the old or
+    the new content, never a partial file.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix='.' + path.name)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as fp:
+            fp.write(content)
+        if path.exists():
+            os.chmod(tmp, path.stat().st_mode & 0o777)
+        else:
+            # mkstemp creates the file readable by its owner only, give it the
+            # mode open() would have
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp, 0o666 & ~umask)
+        os.replace(tmp, str(path))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
@@ -0,0 +1,120 @@
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from theme_installer.utils import percentile
+
+
+def get_url_names(app:str) -> list:
+    """
+    Return the names of the urls of the app which can be reversed without
+    arguments, the default handler is skipped
+    """
+    from django.urls import get_resolver, reverse, NoReverseMatch
+
+    resolver = get_resolver()
+    if app not in resolver.namespace_dict:
+        raise CommandError("The urls of {} are not installed in the root "
+                           "urlconf".format(app))
+
+    names = []
+    sub_resolver = resolver.namespace_dict[app][1]
+    for pattern in sub_resolver.url_patterns:
+        name = getattr(pattern, 'name', None)
+        if not name:
+            continue
+        try:
+            names.append((name, reverse("{}:{}".format(app, name))))
+        except NoReverseMatch:
+            continue
+
+    return names
+
+
+def setup_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def render_pages(pages:list, repeat:int, warmup:int) -> list:
+    """
+    Render each (name, url) couple of `pages` with the test client.
+
+    Return a list of dict with the status, the timings and the size per page
+    """
+    setup_worker()
+    from django.test import Client
+
+    if 'testserver' not in settings.ALLOWED_HOSTS and '*' not in settings.ALLOWED_HOSTS:
+        settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+
+    client = Client()
+    res = []
+    for name, url in pages:
+        page = {'name': name, 'url': url}
+        timings = []
+        try:
+            for i in range(warmup + repeat):
+                start = time.perf_counter()
+                response = client.get(url)
+                # streaming responses are rendered while they are consumed
+                content = b''.join(response) if response.streaming else response.content
+                elapsed = (time.perf_counter() - start) * 1000
+                if i >= warmup:
+                    timings.append(elapsed)
+            page['status'] = response.status_code
+            page['size'] = len(content)
+        except Exception as e:
+            page['status'] = 500
+            page['error'] = "{}: {}".format(type(e).__name__, e)
+
+        page['p50_ms'] = round(percentile(timings, 50), 3)
+        page['p95_ms'] = round(percentile(timings, 95), 3)
+        res.append(page)
+
+    return res
+
+
+class Command(BaseCommand):
+    """Render all the pages of an installed theme and report their timings"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('app', type=str, help="The name of the app where "
+                            "the theme is installed")
+        parser.add_argument('--repeat', type=int, default=5,
+                            help="The number of renders per page")
+        parser.add_argument('--warmup', type=int, default=1,
+                            help="The number of renders per page not measured")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="The number of processes rendering the pages")
+        parser.add_argument('--output', help="The file where to write the "
+                            "report, default to stdout")
+
+    def handle(self, *args, **options):
+        app = options['app']
+        pages = get_url_names(app)
+        repeat = max(options['repeat'], 1)
+        warmup = max(options['warmup'], 0)
+        workers = max(options['workers'], 1)
+
+        if workers > 1 and len(pages) > 1:
+            chunks = [pages[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(render_pages, chunks,
+                                       [repeat] * workers, [warmup] * workers)
+                res = [page for chunk in results for page in chunk]
+            order = {name: i for i, (name, url) in enumerate(pages)}
+            res.sort(key=lambda page: order[page['name']])
+        else:
+            res = render_pages(pages, repeat, warmup)
+
+        report = json.dumps({'app': app, 'repeat': repeat, 'workers': workers,
+                             'pages': res}, indent=2)
+        if options.get('output'):
+            with open(options['output'], 'w') as fp:
+                fp.write(report)
+        else:
+            self.stdout.write(report)
@@ -2,6 +2,9 @@ from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from theme_installer.loaders import CommandLoader
 from theme_installer.core import ThemeInstaller, ViewInstaller, UrlInstaller
+from theme_installer.profiling import Profiler
+from theme_installer.transforms import HtmlTransformer
+from theme_installer.copying import FileCopier
 
 
 class Command(BaseCommand):
@@ -16,6 +19,41 @@ class Command(BaseCommand):
                             help="Include sub themes")
         parser.add_argument('--prefix', action="store_true",
                     help="The STATIC_URL prefix to override default `static`")
+        parser.add_argument('--optimize-images', action="store_true",
+                            help="Losslessly recompress the png and jpeg images")
+        parser.add_argument('--webp', action="store_true",
+                            help="Generate WebP variants of the images")
+        parser.add_argument('--minify', action="store_true",
+                            help="Minify the css and js files")
+        parser.add_argument('--bundle', action="store_true",
+                            help="Concatenate the css and js files shared by many pages")
+        parser.add_argument('--bundle-min-pages', type=int, default=2,
+                            help="The minimum number of pages sharing files to bundle them")
+        parser.add_argument('--preload', action="store_true",
+                            help="Send preload Link headers for the critical "
+                            "css, js and fonts of each page")
+        parser.add_argument('--lazy-images', action="store_true",
+                            help="Lazy load the images and iframes below the fold")
+        parser.add_argument('--eager-images', type=int, default=2,
+                            help="The number of first images considered above the fold")
+        parser.add_argument('--defer-scripts', action="store_true",
+                            help="Defer the scripts which can run after the page is parsed")
+        parser.add_argument('--critical-scripts', nargs='+',
+                            help="Patterns of the scripts which should never be deferred")
+        parser.add_argument('--image-dimensions', action="store_true",
+                            help="Add the width and height of the images")
+        parser.add_argument('--large-file-threshold', type=int, default=8,
+                            metavar='MIB',
+                            help="The size in MiB from which static files are "
+                            "copied in the kernel (reflink, copy_file_range, sendfile)")
+        parser.add_argument('--profile', action="store_true",
+                            help="Profile each phase of the installation")
+        parser.add_argument('--profile-dir', default='theme_profile',
+                            help="The directory where to write the profiles")
+        parser.add_argument('--resume', action="store_true",
+                            help="Resume an interrupted install instead of restarting it")
+        parser.add_argument('--workers', type=int,
+                            help="The number of processes used to optimize the theme")
     
     def handle(self, *args, **options):        
         try:
@@ -27,19 +65,42 @@ class Command(BaseCommand):
                 app = options['name']
                 
             asset_dirs = options.get('assets_dir')
+            profiler = Profiler(options['profile_dir']) if options.get('profile') else None
+            transformer = None
+            if options.get('lazy_images') or options.get('defer_scripts')\
+               or options.get('image_dimensions'):
+                transformer = HtmlTransformer(
+                    lazy_images=options.get('lazy_images'),
+                    eager_images=options.get('eager_images'),
+                    defer_scripts=options.get('defer_scripts'),
+                    critical_scripts=options.get('critical_scripts'),
+                    image_dimensions=options.get('image_dimensions'))
                 
             th = ThemeInstaller(options['name'], options['source'], 
                                 loader, sub_theme=options.get('subthemes'),
                                 prefix=options.get('prefix'),
-                                root_name=app, parent_assets_dir=asset_dirs)
+                                root_name=app, parent_assets_dir=asset_dirs,
+                                optimize_images=options.get('optimize_images'),
+                                webp=options.get('webp'),
+                                minify=options.get('minify'),
+                                bundle=options.get('bundle'),
+                                bundle_min_pages=options.get('bundle_min_pages'),
+                                preload=options.get('preload'),
+                                transformer=transformer,
+                                copier=FileCopier(options['large_file_threshold'] * 1024 * 1024),
+                                workers=options.get('workers'),
+                                profiler=profiler,
+                                resume=options.get('resume'))
             installed_htmls = th.proceed()
             
             vh = ViewInstaller(app, html_paths=installed_htmls,
-                               home_dir=loader.to_dict().get('home_dir'))
+                               home_dir=loader.to_dict().get('home_dir'),
+                               profiler=profiler, preloads=th.preloads)
             created_views = vh.proceed()
             
             uh = UrlInstaller(app, installed_htmls, created_views,
-                              home_dir=loader.to_dict().get('home_dir'))
+                              home_dir=loader.to_dict().get('home_dir'),
+                              profiler=profiler)
             created_urls = uh.proceed()
             
             th.replace_hrefs_html(installed_htmls, created_urls)
@@ -0,0 +1,160 @@
+import posixpath
+import re
+from pathlib import Path
+from theme_installer.utils import rgx_attr, rgx_link, rgx_script, static_url_to_path
+
+rgx_head_end = re.compile(r'</head\s*>', re.I)
+cmp_rgx_link = re.compile(rgx_link, re.I | re.S)
+cmp_rgx_script = re.compile(rgx_script, re.I | re.S)
+rgx_font_face = re.compile(r'@font-face\s*{([^}]*)}', re.I)
+rgx_font_family = re.compile(r'font-family\s*:\s*([^;}]+)', re.I)
+rgx_font_short = re.compile(r'(?<![\w-])font\s*:\s*([^;}]+)', re.I)
+rgx_font_url = re.compile(r'url\(\s*(["\']?)([^"\')]+?\.(woff2|woff|ttf|otf))(?:[?#][^"\')]*)?\1\s*\)', re.I)
+
+FONT_PRIORITY = ['woff2', 'woff', 'ttf', 'otf']
+
+
+class PreloadCollector:
+    """
+    Find the critical dependencies of each installed page: its stylesheets, the
+    blocking scripts of its head and the fonts its stylesheets declare and use
+    in a rule, and compute the `Link` header preloading them.
+
+    :param Path templates_dir: The templates dir of the django project
+    :param list html_paths: The installed html files relative to templates_dir
+    :param Path static_dir: The static dir of the django project
+    :param str static_url: The url prefix of the static dir, like `/static/`
+    :param int max_fonts: The maximum number of fonts preloaded per page
+    """
+
+    def __init__(self, templates_dir:Path, html_paths:list, static_dir:Path,
+                 static_url:str, max_fonts=4):
+        self.templates_dir = Path(templates_dir)
+        self.html_paths = list(dict.fromkeys(html_paths))
+        self.static_dir = Path(static_dir)
+        self.static_url = static_url
+        self.max_fonts = max_fonts
+        self.fonts_cache = {}
+        self.families_cache = {}
+
+    def url_to_path(self, url:str):
+        return static_url_to_path(url, self.static_url, self.static_dir)
+
+    def read_css(self, css_url:str) -> str:
+        path = self.url_to_path(css_url)
+        return path.read_text(encoding='utf-8', errors='ignore') if path else ''
+
+    @staticmethod
+    def family_names(value:str) -> list:
+        return [f.strip().strip('"\'').strip().lower() for f in value.split(',')]
+
+    def find_fonts(self, css_url:str) -> list:
+        """
+        Return the (family, url) couples of the best format of each font
+        declared in a stylesheet
+        """
+        if css_url in self.fonts_cache:
+            return self.fonts_cache[css_url]
+
+        fonts = []
+        base = css_url.rsplit('/', 1)[0] + '/'
+        for face in rgx_font_face.findall(self.read_css(css_url)):
+            family = rgx_font_family.search(face)
+            urls = sorted(rgx_font_url.findall(face),
+                          key=lambda m: FONT_PRIORITY.index(m[2].lower()))
+            if not family or not urls:
+                continue
+            url = urls[0][1]
+            if not url.startswith(('/', 'http:', 'https:', 'data:')):
+                url = posixpath.normpath(posixpath.join(base, url))
+            font = (self.family_names(family.group(1))[0], url)
+            if url.startswith(self.static_url) and font not in fonts:
+                fonts.append(font)
+
+        self.fonts_cache[css_url] = fonts
+        return fonts
+
+    def find_families(self, css_url:str) -> tuple:
+        """
+        Return the font-family declarations and the font shorthands of the
+        rules of a stylesheet, @font-face blocks excluded
+        """
+        if css_url not in self.families_cache:
+            src_code = rgx_font_face.sub('', self.read_css(css_url))
+            families = set()
+            for value in rgx_font_family.findall(src_code):
+                families.update(self.family_names(value))
+            shorthands = [v.lower() for v in rgx_font_short.findall(src_code)]
+            self.families_cache[css_url] = (families, shorthands)
+        return self.families_cache[css_url]
+
+    def find_preloads(self, src_code:str) -> list:
+        """
+        Return the (url, as) couples to preload for a page
+        """
+        preloads = []
+        for m in cmp_rgx_link.finditer(src_code):
+            attrs = {k.lower(): v for k, _, v in rgx_attr.findall(m.group(1))}
+            href = attrs.get('href', '')
+            if attrs.get('rel', '').lower() == 'stylesheet' and self.url_to_path(href):
+                preloads.append((href, 'style'))
+
+        head_end = rgx_head_end.search(src_code)
+        head = src_code[:head_end.start()] if head_end else ''
+        for m in cmp_rgx_script.finditer(head):
+            attrs_str = m.group(1)
+            attrs = {k.lower(): v for k, _, v in rgx_attr.findall(attrs_str)}
+            bare = rgx_attr.sub('', attrs_str).lower().split()
+            # async, deferred and module scripts don't block the rendering
+            if 'async' in bare or 'defer' in bare or 'async' in attrs\
+               or 'defer' in attrs or attrs.get('type') == 'module':
+                continue
+            if self.url_to_path(attrs.get('src', '')):
+                preloads.append((attrs['src'], 'script'))
+
+        # only the fonts used by a rule of the page's stylesheets are critical
+        families, shorthands = set(), []
+        for url, kind in preloads:
+            if kind == 'style':
+                used = self.find_families(url)
+                families.update(used[0])
+                shorthands.extend(used[1])
+        fonts = []
+        for url, kind in preloads:
+            if kind != 'style':
+                continue
+            for family, font in self.find_fonts(url):
+                if font in fonts:
+                    continue
+                if family in families or any(family in s for s in shorthands):
+                    fonts.append(font)
+        preloads.extend((url, 'font') for url in fonts[:self.max_fonts])
+
+        return list(dict.fromkeys(preloads))
+
+    @staticmethod
+    def to_header(preloads:list) -> str:
+        links = []
+        for url, kind in preloads:
+            link = '<{}>; rel=preload; as={}'.format(url, kind)
+            # fonts are always fetched in cors mode
+            if kind == 'font':
+                link += '; crossorigin'
+            links.append(link)
+        return ', '.join(links)
+
+    def proceed(self) -> dict:
+        """
+        Return a dict with the `Link` header of each page having preloads
+        """
+        res = {}
+        for hp in self.html_paths:
+            p = self.templates_dir.joinpath(hp)
+            if not p.is_file():
+                continue
+            preloads = self.find_preloads(p.read_text(encoding='utf-8',
+                                                      errors='ignore'))
+            if preloads:
+                res[hp] = self.to_header(preloads)
+
+        return res
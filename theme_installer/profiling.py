@@ -0,0 +1,102 @@
+import cProfile
+import logging
+import time
+import tracemalloc
+from pathlib import Path
+
+logger = logging.getLogger('')
+
+
+class NoProfiler:
+    """
+    The profiler used when profiling is disabled, its phases do nothing
+    """
+
+    def phase(self, name:str):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Profiler:
+    """
+    Run each phase of an installation under cProfile and tracemalloc and write
+    a `.pstats` file and a summary with the top allocations per phase.
+
+    Nested phases are part of the phase enclosing them, they are not profiled
+    separately.
+
+    :param str output_dir: The dir where the profiles are written
+    :param int top: The number of allocations in the summaries
+    """
+
+    def __init__(self, output_dir:str, top=20):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.top = top
+        self.count = 0
+        self.depth = 0
+
+    def phase(self, name:str):
+        return ProfiledPhase(self, name)
+
+    def write(self, name:str, profile, elapsed:float, peak:int, stats:list):
+        self.count += 1
+        base = self.output_dir.joinpath('{:02d}-{}'.format(self.count, name))
+        profile.dump_stats(str(base) + '.pstats')
+
+        with open(str(base) + '.txt', 'w') as fp:
+            fp.write("Phase: {}\n".format(name))
+            fp.write("Wall time: {:.3f}s\n".format(elapsed))
+            fp.write("Peak memory: {:.1f} KiB\n\n".format(peak / 1024))
+            fp.write("Top {} allocations:\n".format(self.top))
+            for stat in stats[:self.top]:
+                fp.write("{}\n".format(stat))
+
+        logger.info("Profile of {} written in {}.pstats".format(name, base))
+
+
+class ProfiledPhase:
+
+    def __init__(self, profiler:Profiler, name:str):
+        self.profiler = profiler
+        self.name = name.replace('/', '.')
+
+    def __enter__(self):
+        self.profiler.depth += 1
+        if self.profiler.depth > 1:
+            return self
+
+        self.was_tracing = tracemalloc.is_tracing()
+        if not self.was_tracing:
+            tracemalloc.start()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self.snapshot = tracemalloc.take_snapshot()
+        self.profile = cProfile.Profile()
+        self.start = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.depth -= 1
+        if self.profiler.depth > 0:
+            return False
+
+        self.profile.disable()
+        elapsed = time.perf_counter() - self.start
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        stats = snapshot.compare_to(self.snapshot, 'lineno')
+        if not self.was_tracing:
+            tracemalloc.stop()
+
+        self.profiler.write(self.name, self.profile, elapsed, peak, stats)
+        return False
@@ -0,0 +1,151 @@
+import logging
+import re
+from theme_installer.utils import rgx_attr, rgx_script_element, rgx_tag_attrs
+
+logger = logging.getLogger('')
+
+rgx_body = re.compile(r'<body\b', re.I)
+rgx_media = re.compile(r'<(img|iframe)\b(' + rgx_tag_attrs + r'?)(\s*/?)>', re.I | re.S)
+cmp_rgx_script = re.compile(rgx_script_element, re.I | re.S)
+
+# scripts with these types are data, not code, they don't need to run in order
+DATA_SCRIPT_TYPES = ['application/json', 'application/ld+json', 'text/template',
+                     'text/html', 'text/x-template', 'importmap']
+
+
+def parse_attrs(attrs_str:str) -> tuple:
+    """
+    Return the dict of the attributes with values and the list of the bare
+    attributes of a tag
+    """
+    attrs = {k.lower(): v for k, _, v in rgx_attr.findall(attrs_str)}
+    bare = [a.lower() for a in rgx_attr.sub('', attrs_str).replace('/', ' ').split()]
+    return attrs, bare
+
+
+class HtmlTransformer:
+    """
+    Transform the installed pages to load faster. It runs in the same pass as
+    the rewrite of the asset links.
+
+    :param bool lazy_images: Add loading="lazy" and decoding="async" to the
+        images and iframes below the fold
+    :param int eager_images: The number of first images and iframes of the body
+        considered above the fold, they are left untouched
+    :param bool defer_scripts: Add defer to the external scripts which can be
+        deferred without changing the execution order
+    :param list critical_scripts: Patterns of the scripts which should never be
+        deferred, like `jquery`
+    :param bool image_dimensions: Add the width and height of the local images
+        which don't have them
+    """
+
+    def __init__(self, lazy_images=False, eager_images=2, defer_scripts=False,
+                 critical_scripts:list=None, image_dimensions=False):
+        self.lazy_images = lazy_images
+        self.eager_images = eager_images
+        self.defer_scripts = defer_scripts
+        self.critical_scripts = [re.compile(p, re.I) for p in critical_scripts or []]
+        self.image_dimensions = image_dimensions
+        self.sizes_cache = {}
+
+        if image_dimensions:
+            try:
+                import PIL
+            except ImportError:
+                logger.warning("Pillow is not installed, the dimensions of "
+                               "the images are not added")
+                self.image_dimensions = False
+
+    def to_dict(self) -> dict:
+        return {
+            "lazy_images": self.lazy_images,
+            "eager_images": self.eager_images,
+            "defer_scripts": self.defer_scripts,
+            "critical_scripts": [p.pattern for p in self.critical_scripts],
+            "image_dimensions": self.image_dimensions
+        }
+
+    def get_size(self, path):
+        if path not in self.sizes_cache:
+            from PIL import Image
+            try:
+                with Image.open(path) as img:
+                    self.sizes_cache[path] = img.size
+            except Exception:
+                self.sizes_cache[path] = None
+        return self.sizes_cache[path]
+
+    def transform_media(self, src_code:str, url_to_path) -> str:
+        body = rgx_body.search(src_code)
+        body_start = body.start() if body else 0
+        count = [0]
+
+        def repl(m):
+            if m.start() < body_start:
+                return m.group(0)
+            tag, attrs_str, end = m.groups()
+            attrs, bare = parse_attrs(attrs_str)
+            added = []
+
+            count[0] += 1
+            if self.lazy_images and count[0] > self.eager_images\
+               and 'loading' not in attrs and 'loading' not in bare:
+                added.append('loading="lazy"')
+                if tag.lower() == 'img' and 'decoding' not in attrs:
+                    added.append('decoding="async"')
+
+            if self.image_dimensions and tag.lower() == 'img'\
+               and 'width' not in attrs and 'height' not in attrs:
+                path = url_to_path(attrs.get('src', ''))
+                size = self.get_size(path) if path else None
+                if size:
+                    added.append('width="{}" height="{}"'.format(*size))
+
+            if not added:
+                return m.group(0)
+            return '<{}{} {}{}>'.format(tag, attrs_str, ' '.join(added), end)
+
+        return rgx_media.sub(repl, src_code)
+
+    def transform_scripts(self, src_code:str) -> str:
+        """
+        Defer the trailing run of external scripts: a script is deferred only
+        if all the scripts after it are deferred too, so that they still run
+        in the same order. The scripts after a script already deferred are
+        never deferred, they used to run before it.
+        """
+        to_defer = []
+        for m in reversed(list(cmp_rgx_script.finditer(src_code))):
+            attrs, bare = parse_attrs(m.group(1))
+            kind = attrs.get('type', 'text/javascript').lower()
+            if kind in DATA_SCRIPT_TYPES:
+                continue
+            src = attrs.get('src')
+            if 'defer' in bare or 'defer' in attrs:
+                if to_defer:
+                    to_defer = []
+                    break
+                continue
+            if not src or kind == 'module' or 'async' in bare or 'async' in attrs\
+               or kind not in ('text/javascript', 'application/javascript')\
+               or any(p.search(src) for p in self.critical_scripts):
+                break
+            to_defer.append(m)
+
+        for m in to_defer:
+            end = m.end(1)
+            src_code = src_code[:end] + ' defer' + src_code[end:]
+
+        return src_code
+
+    def transform(self, src_code:str, url_to_path) -> str:
+        """
+        Return the transformed page, `url_to_path` maps a static url to the
+        file copied in the static dir
+        """
+        if self.lazy_images or self.image_dimensions:
+            src_code = self.transform_media(src_code, url_to_path)
+        if self.defer_scripts:
+            src_code = self.transform_scripts(src_code)
+        return src_code
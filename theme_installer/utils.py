@@ -1,8 +1,18 @@
 
 import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
 rgx_bad_start = re.compile("^([^A-Za-z]+)")
 
+# html tags shared by the page processors, the link and script patterns are
+# strings to be combined, their first group captures the attributes
+rgx_tag_attrs = r'(?:[^>"\']|=\s*"[^"]*"|=\s*\'[^\']*\')*' # quoted values may hold a >
+rgx_link = r'<link\b(' + rgx_tag_attrs + r')>'
+rgx_script = r'<script\b(' + rgx_tag_attrs + r')>' # the opening tag only
+rgx_script_element = r'<script\b(' + rgx_tag_attrs + r'?)(\s*)>(.*?)</script\s*>'
+rgx_attr = re.compile(r'([\w-]+)\s*=\s*(["\'])(.*?)\2', re.S)
+
 def get_view_name_from_html_name(app:str, html_name:str) -> str:
     if html_name.startswith(app):
         html_name = html_name.replace(app+'/', '', 1)
@@ -34,6 +44,36 @@ def html_name_key(html_name:str):
     real_len = len(html_name.split('/')[-1].split('.html')[0])
     return sl_cnt*100 + real_len
 
+def percentile(values:list, pct:float) -> float:
+    """
+    Return the `pct` percentile of `values` using the nearest-rank method
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = max(int(-(-pct * len(values) // 100)), 1)
+    return values[rank - 1]
+
+def static_url_to_path(url:str, static_url:str, static_dir) -> Path:
+    """
+    Return the file of `static_dir` served at `url`, None if the url is not
+    under `static_url` or the file doesn't exist
+    """
+    if not url.startswith(static_url):
+        return None
+    p = Path(static_dir).joinpath(url[len(static_url):].split('?')[0])
+    return p if p.is_file() else None
+
+def pool_map(func, *iterables, workers=None, chunksize=1) -> list:
+    """
+    Map `func` on `iterables` in a pool of `workers` processes, default to the
+    cpu count. With 0 workers the calls run in this process.
+    """
+    if workers == 0:
+        return list(map(func, *iterables))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, *iterables, chunksize=chunksize))
+
 
 if __name__ == "__main__":
     print(get_view_name_from_html_name('bruce', 'bruce/index.html'))